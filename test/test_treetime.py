@@ -220,3 +220,359 @@ def test_seq_joint_lh_is_max():
     # joint chooses the most likely realization of the tree
     assert(abs(ref.max() - real) < 1e-10)
     return ref, real
+
+
+def test_prob_t_array():
+    """
+    evaluating the branch probability for an array of branch lengths has to
+    agree with stacked scalar evaluations and with the explicit matrix exponential
+    """
+    from treetime import GTR
+    from treetime.seq_utils import seq2prof
+    import numpy as np
+    np.random.seed(1)
+
+    mygtr = GTR.custom(alphabet = np.array(['A', 'C', 'G', 'T']), pi = np.array([0.4, 0.3, 0.2, 0.1]),
+                       W=np.ones((4,4)))
+    seq_p = np.random.choice(mygtr.alphabet, size=200)
+    seq_ch = np.copy(seq_p)
+    seq_ch[:20] = np.random.choice(mygtr.alphabet, size=20)
+    seq_pair, multiplicity = mygtr.state_pair(seq_p, seq_ch)
+    profile_pair = (seq2prof(seq_p, mygtr.profile_map), seq2prof(seq_ch, mygtr.profile_map))
+    mult = np.ones(len(seq_p))
+
+    t_vals = np.array([-0.1, 0.0, 1e-4, 0.01, 0.1, 1.0, 4.0])
+    for return_log in [True, False]:
+        res = mygtr.prob_t_compressed(seq_pair, multiplicity, t_vals, return_log=return_log)
+        ref = np.array([mygtr.prob_t_compressed(seq_pair, multiplicity, t, return_log=return_log) for t in t_vals])
+        assert res.shape == t_vals.shape
+        assert np.allclose(res, ref, rtol=1e-10, atol=0)
+
+        res = mygtr.prob_t_profiles(profile_pair, mult, t_vals, return_log=return_log)
+        ref = np.array([mygtr.prob_t_profiles(profile_pair, mult, t, return_log=return_log) for t in t_vals])
+        assert res.shape == t_vals.shape
+        assert np.allclose(res, ref, rtol=1e-10, atol=0)
+
+    # the propagator is clipped at zero entry by entry before it is contracted with
+    # the profiles. This matters at t=0, where mismatches have probability zero up to rounding.
+    for t in [0.0, 1e-4]:
+        res = np.einsum('ai,ij,aj->a', profile_pair[1], mygtr.expQt(t), profile_pair[0])
+        ref = np.sum(mult*np.log(res+1e-24))
+        assert np.abs(mygtr.prob_t_profiles(profile_pair, mult, t, return_log=True) - ref) < 1e-8*np.abs(ref)
+        assert np.abs(mygtr.prob_t_profiles(profile_pair, mult, np.array([t, 1.0]), return_log=True)[0] - ref) < 1e-8*np.abs(ref)
+
+    # scalar and 0-d input returns a scalar
+    for t in [0.05, np.array(0.05)]:
+        assert np.ndim(mygtr.prob_t_compressed(seq_pair, multiplicity, t, return_log=True))==0
+        assert np.ndim(mygtr.prob_t_profiles(profile_pair, mult, t, return_log=True))==0
+
+    # compare to the explicit matrix exponential for positive branch lengths
+    for t in t_vals[t_vals>0]:
+        logQt = np.log(mygtr.expQt(t))
+        ref = np.sum(logQt[seq_pair[:,1], seq_pair[:,0]]*multiplicity)
+        assert np.abs(mygtr.prob_t_compressed(seq_pair, multiplicity, t, return_log=True) - ref) < 1e-8
+        assert np.abs(mygtr.prob_t_profiles(profile_pair, mult, t, return_log=True) - ref) < 1e-8
+    # negative branch lengths are impossible
+    assert mygtr.prob_t_compressed(seq_pair, multiplicity, -0.1) == 0
+
+
+def test_linear_interpolation():
+    """
+    the linear interpolator backing Distribution objects has to agree with
+    scipy's interp1d inside and outside its grid, also after the grid was
+    modified in place by x_rescale and _adjust_grid
+    """
+    from scipy.interpolate import interp1d
+    from treetime.distribution import LinearInterp, Distribution
+    from treetime.config import BIG_NUMBER
+    import numpy as np
+    np.random.seed(2)
+
+    def reference(x, y):
+        return interp1d(x, y, kind='linear', bounds_error=False, fill_value=BIG_NUMBER, assume_sorted=True)
+
+    x = np.sort(np.random.random(50))*10 - 3
+    y = np.random.random(50)
+    x_eval = np.concatenate((np.linspace(-5, 9, 301), x, [x[0]-1e-10, x[-1]+1e-10]))
+    assert np.allclose(LinearInterp(x, y, fill_value=BIG_NUMBER)(x_eval), reference(x, y)(x_eval),
+                       rtol=1e-12, atol=1e-12)
+    assert np.isclose(LinearInterp(x, y, fill_value=BIG_NUMBER)(x[3]), y[3])
+
+    # rescaling the support, including an inversion of the grid
+    for factor in [2.5, -0.5]:
+        dist = Distribution(x, y, is_log=True, kind='linear')
+        ref_vals = dist(x_eval)
+        dist.x_rescale(factor)
+        assert np.allclose(dist._func(x_eval*factor),
+                           reference(dist._func.x, dist._func.y)(x_eval*factor), rtol=1e-12, atol=1e-12)
+        inside = (x_eval>x[0]) & (x_eval<x[-1])
+        assert np.allclose(dist(x_eval[inside]*factor), ref_vals[inside], rtol=1e-10, atol=1e-10)
+
+    # pruning the grid of a smooth distribution with many points
+    xfine = np.linspace(0, 1, 1001)
+    dist = Distribution(xfine, 50*(xfine-0.3)**2, is_log=True, kind='linear')
+    dist._adjust_grid(rel_tol=0.01)
+    assert len(dist._func.x) < len(xfine)
+    assert np.allclose(dist._func(x_eval), reference(dist._func.x, dist._func.y)(x_eval),
+                       rtol=1e-12, atol=1e-12)
+    assert np.allclose(dist(xfine[1:-1]), 50*(xfine[1:-1]-0.3)**2, atol=0.02)
+
+
+def test_parse_dates():
+    import os
+    import tempfile
+    import numpy as np
+    from treetime.utils import parse_dates, numeric_date
+    import datetime
+    meta = ("name,date\n"
+            "A,2001.5\n"
+            "B,2013-01-15\n"
+            "C,2013-01-15\n"
+            "D,2017-XX-XX\n"
+            "E,2017-03-XX\n"
+            "F,[2002.2:2004.3]\n"
+            "G,not-a-date\n"
+            "H,[2002.2:later]\n"
+            "I,1999\n")
+    fd, fname = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(meta)
+        dates = parse_dates(fname)
+    finally:
+        os.remove(fname)
+
+    # unparseable entries are dropped
+    assert sorted(dates) == ['A', 'B', 'C', 'D', 'E', 'F', 'I']
+    assert dates['A'] == 2001.5 and dates['I'] == 1999.0
+    assert dates['B'] == dates['C'] == numeric_date(datetime.date(2013, 1, 15))
+    # ambiguous dates and brackets are returned as [lower, upper]
+    assert np.allclose(dates['D'], [numeric_date(datetime.date(2017, 1, 1)),
+                                    numeric_date(datetime.date(2017, 12, 31))])
+    assert np.allclose(dates['E'], [numeric_date(datetime.date(2017, 3, 1)),
+                                    numeric_date(datetime.date(2017, 3, 31))])
+    assert type(dates['F']) == list and np.allclose(dates['F'], [2002.2, 2004.3])
+
+
+def test_optimal_t_batch():
+    import numpy as np
+    from treetime import GTR
+    np.random.seed(3)
+    gtr = GTR.custom(pi=np.array([0.4,0.3,0.2,0.1]), W=np.ones((4,4)), alphabet='nuc_nogap')
+    L = 200
+    seq_pairs, multiplicities = [], []
+    # identical sequences, moderately diverged and saturated branches
+    for frac in [0, 0, 0.02, 0.05, 0.2, 0.5, 0.75, 1.0]:
+        parent = np.random.choice(4, size=L, p=gtr.Pi)
+        child = parent.copy()
+        mut = np.random.random(L)<frac
+        child[mut] = np.random.choice(4, size=mut.sum())
+        pairs, counts = np.unique(np.array([parent, child]).T, axis=0, return_counts=True)
+        seq_pairs.append(pairs)
+        multiplicities.append(counts.astype(float))
+    # completely divergent: only mismatches
+    seq_pairs.append(np.array([[0,1],[2,3]]))
+    multiplicities.append(np.array([5.0,5.0]))
+
+    def log_lh(t):
+        return np.array([gtr.prob_t_compressed(sp, m, x, return_log=True)
+                         for sp, m, x in zip(seq_pairs, multiplicities, t)])
+
+    scalar = np.array([gtr.optimal_t_compressed(sp, m) for sp, m in zip(seq_pairs, multiplicities)])
+    # max_iter=1 leaves most branches unconverged such that they hit the scalar fallback
+    for max_iter in [50, 1]:
+        batch = gtr.optimal_t_compressed_batch(seq_pairs, multiplicities, max_iter=max_iter)
+        assert batch.shape == scalar.shape
+        # zero length branches are tiny but positive, as with the scalar optimizer
+        assert np.all(batch[:2] > 0) and np.all(batch[:2] < 1e-15)
+        assert np.allclose(batch, scalar, rtol=1e-6, atol=1e-8)
+        assert np.all(log_lh(batch) >= log_lh(scalar) - 1e-6)
+
+    assert len(gtr.optimal_t_compressed_batch([], [])) == 0
+
+
+def _clustered_star_tree():
+    """
+    star tree of tips that define a clock and three clusters of recent tips
+    sharing few mutations, i.e. tips whose branches are stretched. Returns
+    the tree as newick string, the alignment and the dates.
+    """
+    import numpy as np
+    from Bio.Align import MultipleSeqAlignment
+    from Bio.SeqRecord import SeqRecord
+    from Bio.Seq import Seq
+
+    rng = np.random.RandomState(7)
+    L = 1000
+    root_seq = rng.choice(list('ACGT'), size=L)
+    def mutate(seq, k):
+        seq = seq.copy()
+        for pos in rng.choice(L, size=k, replace=False):
+            seq[pos] = rng.choice([c for c in 'ACGT' if c!=seq[pos]])
+        return seq
+
+    seqs, dates = {}, {}
+    for ti, year in enumerate(np.linspace(1995, 2020, 8)):
+        seqs['o%d'%ti] = mutate(root_seq, int(year-1990))
+        dates['o%d'%ti] = year
+    for ci, (n_shared, year) in enumerate([(3, 2019), (2, 2016), (4, 2018)]):
+        cluster = mutate(root_seq, n_shared)
+        for ti in range(4):
+            seqs['c%d_%d'%(ci, ti)] = mutate(cluster, ti%2)
+            dates['c%d_%d'%(ci, ti)] = year + 0.2*ti
+    newick = '('+','.join('%s:0.01'%k for k in seqs)+');'
+    aln = MultipleSeqAlignment([SeqRecord(Seq(''.join(s)), id=k, name=k) for k, s in seqs.items()])
+    return newick, aln, dates
+
+
+def test_resolve_polytomies():
+    """
+    Resolve a star tree with clusters of closely related tips and prove that
+    merging pairs best-first against upper bounds of their gain results in
+    the same mergers as evaluating all pairs.
+    """
+    import numpy as np
+    from Bio import Phylo
+    from treetime import TreeTime
+
+    newick, aln, dates = _clustered_star_tree()
+
+    class CountingTreeTime(TreeTime):
+        def resolve_polytomies(self, merge_compressed=False):
+            self.merges.append(super(CountingTreeTime, self).resolve_polytomies(merge_compressed))
+            return self.merges[-1]
+
+    class ExhaustiveTreeTime(CountingTreeTime):
+        def resolve_polytomies(self, merge_compressed=False):
+            # a merger cost that is identically zero leaves the likelihood unchanged
+            # but disables the upper bounds, hence all pairs are evaluated
+            for n in self.tree.find_clades():
+                if n.up is not None and n.branch_length_interpolator.merger_cost is None:
+                    n.branch_length_interpolator.merger_cost = lambda t, x, multiplicity=None: 0.0*x
+            return super(ExhaustiveTreeTime, self).resolve_polytomies(merge_compressed)
+
+    def resolve(tt_class, Tc):
+        np.random.seed(0)
+        tt = tt_class(gtr='JC69', tree=Phylo.read(StringIO(newick), 'newick'),
+                      aln=aln, dates=dates, verbose=0)
+        tt.merges = []
+        tt.run(root=None, max_iter=2, resolve_polytomies=True, Tc=Tc)
+        clades = sorted(tuple(sorted(n.name for n in c.get_terminals()))
+                        for c in tt.tree.get_nonterminals())
+        return tt.merges, clades
+
+    for Tc in [None, 0.01]:
+        merges, clades = resolve(CountingTreeTime, Tc)
+        ref_merges, ref_clades = resolve(ExhaustiveTreeTime, Tc)
+        assert merges[0] > 0
+        assert merges == ref_merges
+        assert clades == ref_clades
+
+
+def test_merger_position_with_coalescent():
+    """
+    With a coalescent merger cost, the gain of merging two nodes is smooth and
+    the position of the new node is found by bounded minimization.
+    """
+    import numpy as np
+    from Bio import Phylo
+    from treetime import TreeTime
+    import treetime.treetime as tt_module
+
+    newick, aln, dates = _clustered_star_tree()
+    np.random.seed(0)
+    tt = TreeTime(gtr='JC69', tree=Phylo.read(StringIO(newick), 'newick'),
+                  aln=aln, dates=dates, verbose=0)
+    tt.run(root=None, max_iter=1, resolve_polytomies=False, Tc=0.01)
+
+    # record the bounded minimizations of the merger gain
+    optima = []
+    sciopt = tt_module.sciopt
+    class RecordingOptimize(object):
+        @staticmethod
+        def minimize_scalar(*args, **kwargs):
+            res = sciopt.minimize_scalar(*args, **kwargs)
+            optima.append(res['x'])
+            return res
+    tt_module.sciopt = RecordingOptimize
+    try:
+        old_nodes = set(tt.tree.find_clades())
+        n_merged = tt.resolve_polytomies()
+    finally:
+        tt_module.sciopt = sciopt
+
+    new_nodes = [n for n in tt.tree.find_clades() if n not in old_nodes]
+    assert n_merged > 0 and len(new_nodes) > 0
+    for n in new_nodes:
+        assert n.time_before_present in optima
+        assert max(c.time_before_present for c in n.clades) < n.time_before_present < n.up.time_before_present
+
+
+def test_optimize_branch_lengths_joint_batch():
+    """
+    optimizing all branch lengths of a tree at once has to agree with the
+    branch by branch optimization
+    """
+    import numpy as np
+    from Bio import Phylo, AlignIO
+    from treetime import TreeAnc, GTR
+    from treetime import seq_utils
+    np.random.seed(5)
+
+    newick = ("(((A:0.01,B:0.0)AB:0.02,(C:0.005,D:0.03)CD:0.0)ABCD:0.05,"
+              "((E:0.0,F:0.0)EF:0.01,(G:0.2,H:0.002)GH:0.04)EFGH:0.01,I:0.3)root:0.0;")
+    mygtr = GTR.custom(alphabet = np.array(['A', 'C', 'G', 'T']), pi = np.array([0.4, 0.3, 0.2, 0.1]),
+                       W=np.ones((4,4)))
+    tree = Phylo.read(StringIO(newick), 'newick')
+    tree.root.ref_seq = np.random.choice(mygtr.alphabet, p=mygtr.Pi, size=1000)
+    for node in tree.get_nonterminals(order='preorder'):
+        for c in node.clades:
+            p = mygtr.evolve(seq_utils.seq2prof(node.ref_seq, mygtr.profile_map), c.branch_length)
+            c.ref_seq = np.array([mygtr.alphabet[np.random.choice(4, p=pk/pk.sum())] for pk in p])
+    alnstr = "".join(">%s\n%s\n"%(leaf.name, ''.join(leaf.ref_seq.astype('U')))
+                     for leaf in tree.get_terminals())
+
+    class BranchByBranchTreeAnc(TreeAnc):
+        @property
+        def _batch_branch_length_ok(self):
+            return False
+
+    lengths = []
+    for tree_anc_class in [TreeAnc, BranchByBranchTreeAnc]:
+        ta = tree_anc_class(gtr=mygtr, tree=Phylo.read(StringIO(newick), 'newick'),
+                            aln=AlignIO.read(StringIO(alnstr), 'fasta'), verbose=0)
+        ta.infer_ancestral_sequences(marginal=False)
+        ta.optimize_branch_lengths_joint()
+        lengths.append(np.array([n.branch_length for n in ta.tree.find_clades() if n.up is not None]))
+
+    batch, scalar = lengths
+    assert np.sum(scalar < 1e-10) > 0
+    assert np.allclose(batch, scalar, rtol=1e-5, atol=1e-8)
+
+
+def test_resolve_polytomies_zero_gain():
+    """
+    A merger that leaves the likelihood unchanged is accepted. Such pairs have
+    an upper bound of zero on their gain and still need to be evaluated.
+    """
+    import numpy as np
+    from Bio import Phylo
+    from treetime import TreeTime
+
+    newick, aln, dates = _clustered_star_tree()
+    np.random.seed(0)
+    tt = TreeTime(gtr='JC69', tree=Phylo.read(StringIO(newick), 'newick'),
+                  aln=aln, dates=dates, verbose=0)
+    tt.run(root=None, max_iter=0, resolve_polytomies=False)
+
+    # a polytomy of five children at the position of their parent: neither
+    # branch can get shorter, hence all bounds and gains are zero
+    root = tt.tree.root
+    root.clades = root.clades[:5]
+    for c in root.clades:
+        c.time_before_present = root.time_before_present
+        c.branch_length = 0.0
+
+    n_merged = tt.resolve_polytomies(merge_compressed=True)
+    assert n_merged == 3
+    assert len(root.clades) == 2
@@ -65,7 +65,7 @@ class BranchLenInterpolator (Distribution):
                 # for short branches, the number of mutations is poissonian. the prob of a branch to have l=mutation_length*L
                 # mutations when its length is k, is therefor e^{-kL}(kL)^(Ll)/(Ll)!. Ignoring constants, the log is
                 # -kL + lL\log(k)
-                log_prob = np.array([ k - mutation_length*np.log(k+ttconf.MIN_BRANCH_LENGTH*one_mutation) for k in grid])/one_mutation
+                log_prob = (grid - mutation_length*np.log(grid+ttconf.MIN_BRANCH_LENGTH*one_mutation))/one_mutation
                 log_prob -= log_prob.min()
             else:
                 # make it a Gaussian
@@ -74,15 +74,13 @@ class BranchLenInterpolator (Distribution):
                 nm_inv = np.exp(l/p0)
                 sigma_sq = p0*(nm_inv-1)*(nm_inv - p0*(nm_inv-1))*one_mutation
                 sigma = np.sqrt(sigma_sq+ttconf.MIN_BRANCH_LENGTH*one_mutation)
-                log_prob = np.array(np.min([[ 0.5*(mutation_length-k)**2/sigma_sq for k in grid],
-                                             100 + np.abs([(mutation_length-k)/sigma for k in grid])], axis=0))
+                log_prob = np.minimum(0.5*(mutation_length-grid)**2/sigma_sq,
+                                      100 + np.abs((mutation_length-grid)/sigma))
         elif branch_length_mode=='marginal':
             if hasattr(node, 'profile_pair'):
-                log_prob = np.array([-self.gtr.prob_t_profiles(node.profile_pair,
-                                                        pattern_multiplicity,
-                                                        k,
-                                                        return_log=True)
-                                    for k in grid])
+                log_prob = -self.gtr.prob_t_profiles(node.profile_pair,
+                                                     pattern_multiplicity,
+                                                     grid, return_log=True)
             else:
                 raise Exception("profile pairs need to be assigned to node")
 
@@ -91,11 +89,9 @@ class BranchLenInterpolator (Distribution):
             if not hasattr(node, 'branch_state'):
                 raise Exception("branch state pairs need to be assigned to nodes")
 
-            log_prob = np.array([-self.gtr.prob_t_compressed(node.branch_state['pair'],
-                                                    node.branch_state['multiplicity'],
-                                                    k,
-                                                    return_log=True)
-                                for k in grid])
+            log_prob = -self.gtr.prob_t_compressed(node.branch_state['pair'],
+                                                   node.branch_state['multiplicity'],
+                                                   grid, return_log=True)
         else:
             raise Exception("unknown branch length mode! "+branch_length_mode)
         # tmp_dis = Distribution(grid, log_prob, is_log=True, kind='linear')
@@ -118,6 +114,10 @@ class BranchLenInterpolator (Distribution):
 
     @merger_cost.setter
     def merger_cost(self, cost_func):
+        # without a merger cost before and after, the peak found on
+        # construction of the distribution is still valid
+        if cost_func is None and self._merger_cost is None:
+            return
         self._merger_cost = cost_func
         self._peak_idx = np.argmin(self.__call__(self.x))
         self._peak_pos = self.x[self._peak_idx]
@@ -270,7 +270,7 @@ class ClockTree(TreeAnc):
         # make interpolation objects for the branches
         self.logger('ClockTree.init_date_constraints: Initializing branch length interpolation objects...',3)
         has_clock_length = []
-        for node in self.tree.find_clades(order='postorder'):
+        for node in self._postorder:
             if node.up is None:
                 node.branch_length_interpolator = None
             else:
@@ -300,7 +300,7 @@ class ClockTree(TreeAnc):
         self.get_clock_model(covariation=use_cov, slope=clock_rate)
 
         # make node distribution objects
-        for node in self.tree.find_clades(order="postorder"):
+        for node in self._postorder:
             # node is constrained
             if hasattr(node, 'raw_date_constraint') and node.raw_date_constraint is not None:
                 # set the absolute time before present in branch length units
@@ -375,7 +375,7 @@ class ClockTree(TreeAnc):
 
         self.logger("ClockTree - Joint reconstruction:  Propagating leaves -> root...", 2)
         # go through the nodes from leaves towards the root:
-        for node in self.tree.find_clades(order='postorder'):  # children first, msg to parents
+        for node in self._postorder:  # children first, msg to parents
             # Lx is the maximal likelihood of a subtree given the parent position
             # Cx is the branch length corresponding to the maximally likely subtree
             if node.bad_branch:
@@ -432,7 +432,7 @@ class ClockTree(TreeAnc):
 
         # go through the nodes from root towards the leaves and assign joint ML positions:
         self.logger("ClockTree - Joint reconstruction:  Propagating root -> leaves...", 2)
-        for node in self.tree.find_clades(order='preorder'):  # root first, msgs to children
+        for node in self._preorder:  # root first, msgs to children
 
             if node.up is None: # root node
                 continue # the position was already set on the previous step
@@ -470,7 +470,7 @@ class ClockTree(TreeAnc):
         Return the likelihood of the data given the current branch length in the tree
         '''
         LH = 0
-        for node in self.tree.find_clades(order='preorder'):  # sum the likelihood contributions of all branches
+        for node in self._preorder:  # sum the likelihood contributions of all branches
             if node.up is None: # root node
                 continue
             LH -= node.branch_length_interpolator(node.branch_length)
@@ -522,7 +522,7 @@ class ClockTree(TreeAnc):
 
         self.logger("ClockTree - Marginal reconstruction:  Propagating leaves -> root...", 2)
         # go through the nodes from leaves towards the root:
-        for node in self.tree.find_clades(order='postorder'):  # children first, msg to parents
+        for node in self._postorder:  # children first, msg to parents
             if node.bad_branch:
                 # no information
                 node.marginal_pos_Lx = None
@@ -571,7 +571,7 @@ class ClockTree(TreeAnc):
 
         self.logger("ClockTree - Marginal reconstruction:  Propagating root -> leaves...", 2)
         from scipy.interpolate import interp1d
-        for node in self.tree.find_clades(order='preorder'):
+        for node in self._preorder:
 
             ## The root node
             if node.up is None:
@@ -641,7 +641,8 @@ class ClockTree(TreeAnc):
                 node.marginal_inverse_cdf=interp1d([0,1], node.marginal_pos_LH.peak_pos*np.ones(2), kind="linear")
             else:
                 dt = np.diff(node.marginal_pos_LH.x)
-                y = node.marginal_pos_LH.prob_relative(node.marginal_pos_LH.x)
+                # evaluate on the grid of the distribution, no interpolation needed
+                y = np.exp(-(node.marginal_pos_LH.y - node.marginal_pos_LH.peak_val))
                 int_y = np.concatenate(([0], np.cumsum(dt*(y[1:]+y[:-1])/2.0)))
                 int_y/=int_y[-1]
                 node.marginal_inverse_cdf = interp1d(int_y, node.marginal_pos_LH.x, kind="linear")
@@ -764,10 +765,10 @@ class ClockTree(TreeAnc):
         """
         if hasattr(node, "numdate_rate_variation"):
             from scipy.special import erfinv
-            nsig = [np.sqrt(2.0)*erfinv(-1.0 + 2.0*x) if x*(1.0-x) else 0
-                    for x in interval]
+            interval = np.asarray(interval, dtype=float)
+            nsig = np.where(interval*(1.0-interval), np.sqrt(2.0)*erfinv(-1.0 + 2.0*interval), 0)
             l,c,u = [x[1] for x in node.numdate_rate_variation]
-            return np.array([c + x*np.abs(y-c) for x,y in zip(nsig, (l,u))])
+            return c + nsig*np.abs(np.array([l,u]) - c)
 
         else:
             return None
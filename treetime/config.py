@@ -6,6 +6,7 @@ SUPERTINY_NUMBER = 1e-24
 MIN_LOG = -1e8 # minimal log value
 MIN_BRANCH_LENGTH = 1e-3 # fraction of length 'one_mutation' that is used as lower cut-off for branch lengths in GTR
 OVER_DISPERSION = 10
+MAX_JOINT_MESSAGE_SIZE = 2**22 # max number of entries of the (sites x states x states) temporary in joint reconstruction
 
 # distribution parameters
 BRANCH_GRID_SIZE_ROUGH = 200
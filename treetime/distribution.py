@@ -6,9 +6,27 @@ try:
 except ImportError:
     from collections import Iterable
 from copy import deepcopy as make_copy
-from scipy.ndimage import binary_dilation
 from .config import BIG_NUMBER, MIN_LOG, MIN_INTEGRATION_PEAK, TINY_NUMBER
 
+class LinearInterp(object):
+    """
+    Lightweight piecewise linear interpolator that stores the grid and the
+    values as arrays x and y. It is a drop-in replacement for
+    scipy.interpolate.interp1d(kind='linear', bounds_error=False) that
+    evaluates via np.interp without interp1d's per-call argument handling.
+    Values outside the grid are set to fill_value.
+    """
+    __slots__ = ('x', 'y', 'fill_value')
+
+    def __init__(self, x, y, fill_value=BIG_NUMBER):
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        self.fill_value = fill_value
+
+    def __call__(self, x):
+        return np.interp(x, self.x, self.y, left=self.fill_value, right=self.fill_value)
+
+
 class Distribution(object):
     """
     Class to implement the probability distribution. This class wraps the scipy
@@ -26,7 +44,7 @@ class Distribution(object):
         full-width-half-max
         """
 
-        if isinstance(distribution, interp1d):
+        if isinstance(distribution, (interp1d, LinearInterp)):
 
             if is_neg_log:
                 ymin = distribution.y.min()
@@ -98,7 +116,10 @@ class Distribution(object):
 
             x_vals = np.unique(np.concatenate([k.x for k in dists]))
             x_vals = x_vals[(x_vals>new_xmin-TINY_NUMBER)&(x_vals<new_xmax+TINY_NUMBER)]
-            y_vals = np.sum([k.__call__(x_vals) for k in dists], axis=0)
+            # accumulate the neg-log values of all factors in a single buffer
+            y_vals = np.zeros_like(x_vals, dtype=float)
+            for k in dists:
+                y_vals += k.__call__(x_vals)
             peak = y_vals.min()
             ind = (y_vals-peak)<BIG_NUMBER/1000
             n_points = ind.sum()
@@ -149,8 +170,11 @@ class Distribution(object):
             yvals -= self._peak_val
             self._ymax = yvals.max()
             # store the interpolation object
-            self._func= interp1d(xvals, yvals, kind=kind, fill_value=BIG_NUMBER,
-                                 bounds_error=False, assume_sorted=True)
+            if kind=='linear':
+                self._func = LinearInterp(xvals, yvals, fill_value=BIG_NUMBER)
+            else:
+                self._func= interp1d(xvals, yvals, kind=kind, fill_value=BIG_NUMBER,
+                                     bounds_error=False, assume_sorted=True)
             self._fwhm = Distribution.calc_fwhm(self)
 
         elif np.isscalar(x):
@@ -227,10 +251,8 @@ class Distribution(object):
 
         if isinstance(x, Iterable):
             valid_idxs = (x > self._xmin-TINY_NUMBER) & (x < self._xmax+TINY_NUMBER)
-            res = np.ones_like (x, dtype=float) * (BIG_NUMBER+self.peak_val)
-            tmp_x = np.copy(x[valid_idxs])
-            tmp_x[tmp_x<self._xmin+TINY_NUMBER] = self._xmin+TINY_NUMBER
-            tmp_x[tmp_x>self._xmax-TINY_NUMBER] = self._xmax-TINY_NUMBER
+            res = np.full_like(x, BIG_NUMBER+self.peak_val, dtype=float)
+            tmp_x = np.clip(x[valid_idxs], self._xmin+TINY_NUMBER, self._xmax-TINY_NUMBER)
             res[valid_idxs] = self._peak_val + self._func(tmp_x)
             return res
 
@@ -315,7 +337,7 @@ class Distribution(object):
         x = np.linspace(a,b,n)
         dx = np.diff(x)
         y = self.prob_relative(x)
-        return mult*np.sum(dx*(y[:-1] + y[1:]))
+        return mult*(y[:-1] + y[1:]).dot(dx)
 
 
     def integrate_simpson(self, a=None,b=None,n=None):
@@ -326,13 +348,12 @@ class Distribution(object):
         threshold = np.array([a,self.peak_pos-dpeak, self.peak_pos+dpeak,b])
         threshold = threshold[(threshold>=a)&(threshold<=b)]
         threshold.sort()
-        res = []
-        for lw, up in zip(threshold[:-1], threshold[1:]):
-            x = np.linspace(lw,up,n)
-            dx = np.diff(x[::2])
-            y = self.prob_relative(x)
-            res.append(mult*(dx[0]*y[0]+ np.sum(4*dx*y[1:-1:2])
-                    + np.sum((dx[:-1]+dx[1:])*y[2:-1:2]) + dx[-1]*y[-1]))
+        # evaluate all integration intervals in one go: one row per interval
+        x = np.linspace(threshold[:-1], threshold[1:], n, axis=1)
+        dx = np.diff(x[:,::2], axis=1)
+        y = self.prob_relative(x.ravel()).reshape(x.shape)
+        # weighted sums over the interior points as row-wise dot products
+        res = mult*(dx[:,0]*y[:,0] + 4*np.einsum('ij,ij->i', dx, y[:,1:-1:2])
+                    + np.einsum('ij,ij->i', dx[:,:-1]+dx[:,1:], y[:,2:-1:2]) + dx[:,-1]*y[:,-1])
 
         return np.sum(res)
-
@@ -602,7 +602,6 @@ class GTR(object):
         if pattern_multiplicity is None:
             pattern_multiplicity = np.ones_like(seq_p, dtype=float)
 
-        from collections import Counter
         if seq_ch.shape != seq_p.shape:
             raise ValueError("GTR.state_pair: Sequence lengths do not match!")
 
@@ -661,22 +660,29 @@ class GTR(object):
             The number of times a parent-child state pair is observed.
             This allows compression of the sequence representation
 
-          t : float
-            Length of the branch separating parent and child
+          t : float or numpy array
+            Length of the branch separating parent and child. If an array of
+            branch lengths is passed, the probability is evaluated for all of
+            them at once and an array of the same length is returned.
 
           return_log : bool
             Whether or not to exponentiate the result
 
         '''
-        if t<0:
-            logP = -ttconf.BIG_NUMBER
-        else:
-            tmp_eQT = self.expQt(t)
+        t_arr = np.atleast_1d(t)
+        logP = np.full(t_arr.shape, -ttconf.BIG_NUMBER)
+        valid = t_arr>=0
+        if valid.any():
+            # exp(Qt) for all valid branch lengths at once, shape (n_t, a, a)
+            tmp_eQT = np.maximum(0, np.einsum('ij,tj,jk->tik', self.v,
+                                              self._exp_lt(t_arr[valid][:,None]), self.v_inv))
             bad_indices=(tmp_eQT==0)
             logQt = np.log(tmp_eQT + ttconf.TINY_NUMBER*(bad_indices))
             logQt[np.isnan(logQt) | np.isinf(logQt) | bad_indices] = -ttconf.BIG_NUMBER
-            logP = np.sum(logQt[seq_pair[:,1], seq_pair[:,0]]*multiplicity)
+            logP[valid] = np.sum(logQt[:, seq_pair[:,1], seq_pair[:,0]]*multiplicity, axis=1)
 
+        if np.ndim(t)==0:
+            logP = logP[0]
         return logP if return_log else np.exp(logP)
 
 
@@ -797,11 +803,21 @@ class GTR(object):
                 to be separated by the time t.
             """
             if profiles:
-                res = -1.0*self.prob_t_profiles(seq_pair, multiplicity,t**2, return_log=True)
+                if weights is None:
+                    res = -1.0*self.prob_t_profiles(seq_pair, multiplicity,t**2, return_log=True)
+                else:
+                    res = -1.0*self._log_prob_t_profiles(seq_pair, weights, np.array([t**2]))[0]
                 return res + np.exp(t**4/10000)
             else:
                 return -1.0*self.prob_t_compressed(seq_pair, multiplicity,t**2, return_log=True)
 
+        # the profiles don't change during the optimization: compute the
+        # weights of the alignment patterns once rather than for every evaluation
+        if profiles and len(self.eigenvals.shape)==1:
+            weights = self._profile_pair_weights(seq_pair, multiplicity)
+        else:
+            weights = None
+
         try:
             from scipy.optimize import minimize_scalar
             opt = minimize_scalar(_neg_prob,
@@ -831,6 +847,102 @@ class GTR(object):
         return new_len
 
 
+    def optimal_t_compressed_batch(self, seq_pairs, multiplicities, tol=1e-10, max_iter=50):
+        """
+        Find the optimal distances for many branches at once. Each branch is
+        represented by its state pairs as in :py:meth:`optimal_t_compressed`.
+        All branches are optimized simultaneously by Newton's method on arrays
+        of branch lengths. Branches that do not converge or where the likelihood
+        is not concave fall back to :py:meth:`optimal_t_compressed`.
+
+        Parameters
+        ----------
+
+         seq_pairs : list of numpy arrays
+            State pairs of each branch, see :py:meth:`state_pair`
+
+         multiplicities : list of numpy arrays
+            Number of times each state pair of the corresponding branch is observed
+
+         tol : float
+            Tolerance of the branch length optimization
+
+         max_iter : int
+            Maximal number of Newton iterations
+
+        Returns
+        -------
+
+         new_lens : numpy array
+            Optimal length of each branch
+
+        """
+        n_branches = len(seq_pairs)
+        if n_branches==0:
+            return np.zeros(0)
+
+        # concatenate the state pairs of all branches and remember which branch they belong to
+        branch_idx = np.concatenate([np.full(len(m), bi, dtype=int) for bi, m in enumerate(multiplicities)])
+        pairs = np.concatenate([sp.reshape(-1,2) for sp in seq_pairs]).astype(int)
+        mult = np.concatenate(multiplicities).astype(float)
+
+        # probability of each pair as a function of t is coeff.dot(exp(rates*t))
+        coeff = self.v[pairs[:,1]]*self.v_inv[:,pairs[:,0]].T
+        rates = self.mu*self.eigenvals
+
+        def _log_lh_derivatives(t):
+            terms = coeff*np.exp(rates*t[branch_idx,None])
+            prob = np.maximum(ttconf.SUPERTINY_NUMBER, terms.sum(axis=1))
+            dlog = terms.dot(rates)/prob
+            d2log = terms.dot(rates**2)/prob - dlog**2
+            return (np.bincount(branch_idx, weights=mult*np.log(prob), minlength=n_branches),
+                    np.bincount(branch_idx, weights=mult*dlog, minlength=n_branches),
+                    np.bincount(branch_idx, weights=mult*d2log, minlength=n_branches))
+
+        # start from the fraction of differing states
+        n_sites = np.bincount(branch_idx, weights=mult, minlength=n_branches)
+        n_diff = np.bincount(branch_idx, weights=mult*(pairs[:,0]!=pairs[:,1]), minlength=n_branches)
+        hamming = n_diff/np.maximum(n_sites, ttconf.TINY_NUMBER)
+
+        t = hamming.copy()
+        logLH, grad, hess = _log_lh_derivatives(t)
+        converged = (t==0)&(grad<=0)
+        failed = np.zeros(n_branches, dtype=bool)
+        for it in range(max_iter):
+            failed |= (~converged)&(hess>=0)
+            active = ~(converged|failed)
+            if not active.any():
+                break
+
+            step = np.zeros(n_branches)
+            step[active] = -grad[active]/hess[active]
+            t_new = np.clip(t + step, 0, ttconf.MAX_BRANCH_LENGTH)
+            new_logLH, new_grad, new_hess = _log_lh_derivatives(t_new)
+            # backtrack towards the previous branch length if the likelihood decreased
+            for bt in range(20):
+                worse = active & (new_logLH < logLH)
+                if not worse.any():
+                    break
+                t_new[worse] = 0.5*(t[worse] + t_new[worse])
+                new_logLH, new_grad, new_hess = _log_lh_derivatives(t_new)
+
+            converged |= active & ((np.abs(t_new-t) <= tol*(1+t)) | ((t_new==0)&(new_grad<=0)))
+            t, logLH, grad, hess = t_new, new_logLH, new_grad, new_hess
+        failed |= ~converged
+
+        # steps are projected onto t>=0, branches at the boundary are
+        # converged. Like the scalar optimizer, which optimizes sqrt(t) to
+        # tolerance tol, report them as tol**2 rather than exactly zero.
+        t[(t==0)&converged] = tol**2
+        for bi in np.where(failed)[0]:
+            t[bi] = self.optimal_t_compressed(seq_pairs[bi], multiplicities[bi], tol=tol)
+
+        if np.any(t > .9 * ttconf.MAX_BRANCH_LENGTH):
+            self.logger("WARNING: GTR.optimal_t_compressed_batch -- Some branch lengths seem to be very long!", 4, warn=True)
+
+        return t
+
+
     def prob_t_profiles(self, profile_pair, multiplicity, t,
                         return_log=False, ignore_gaps=True):
         '''
@@ -846,8 +958,10 @@ class GTR(object):
           multiplicity : numpy array
             The number of times an alignment pattern is observed
 
-          t : float
-            Length of the branch separating parent and child
+          t : float or numpy array
+            Length of the branch separating parent and child. If an array of
+            branch lengths is passed, the probability is evaluated for all of
+            them at once and an array of the same length is returned.
 
           ignore_gaps: bool
             If True, ignore mutations to and from gaps in distance calculations
@@ -856,24 +970,46 @@ class GTR(object):
             Whether or not to exponentiate the result
 
         '''
-        if t<0:
-            logP = -ttconf.BIG_NUMBER
-        else:
-            Qt = self.expQt(t)
-            if len(Qt.shape)==3: # site specific GTR model
-                res = np.einsum('ai,ija,aj->a', profile_pair[1], Qt, profile_pair[0])
-            else:
-                res = np.einsum('ai,ij,aj->a', profile_pair[1], Qt, profile_pair[0])
-            if ignore_gaps and (self.gap_index is not None): # calculate the probability that neither outgroup/node has a gap
-                non_gap_frac = (1-profile_pair[0][:,self.gap_index])*(1-profile_pair[1][:,self.gap_index])
-                # weigh log LH by the non-gap probability
-                logP = np.sum(multiplicity*np.log(res+ttconf.SUPERTINY_NUMBER)*non_gap_frac)
+        t_arr = np.atleast_1d(t)
+        logP = np.full(t_arr.shape, -ttconf.BIG_NUMBER)
+        valid = t_arr>=0
+        if valid.any():
+            weights = self._profile_pair_weights(profile_pair, multiplicity, ignore_gaps=ignore_gaps)
+            if len(self.eigenvals.shape)==2: # site specific GTR model
+                res = np.array([np.einsum('ai,ija,aj->a', profile_pair[1], self.expQt(tval), profile_pair[0])
+                                for tval in t_arr[valid]])
+                logP[valid] = np.log(res+ttconf.SUPERTINY_NUMBER).dot(weights)
             else:
-                logP = np.sum(multiplicity*np.log(res+ttconf.SUPERTINY_NUMBER))
+                logP[valid] = self._log_prob_t_profiles(profile_pair, weights, t_arr[valid])
 
+        if np.ndim(t)==0:
+            logP = logP[0]
         return logP if return_log else np.exp(logP)
 
 
+    def _profile_pair_weights(self, profile_pair, multiplicity, ignore_gaps=True):
+        """
+        Weights of the log likelihood of each alignment pattern. If gaps are
+        ignored, the multiplicity is weighed by the probability that neither
+        parent nor child has a gap.
+        """
+        if ignore_gaps and (self.gap_index is not None):
+            return multiplicity*(1-profile_pair[0][:,self.gap_index])*(1-profile_pair[1][:,self.gap_index])
+        return multiplicity
+
+
+    def _log_prob_t_profiles(self, profile_pair, weights, t):
+        """
+        Log likelihood of a pair of profiles for an array of non-negative
+        branch lengths t. Like in the scalar evaluation, negative entries of
+        the propagator :py:meth:`expQt` are set to zero before it is contracted
+        with the profiles.
+        """
+        return np.array([weights.dot(np.log((profile_pair[1].dot(self.expQt(tval))*profile_pair[0]).sum(axis=1)
+                                            + ttconf.SUPERTINY_NUMBER))
+                         for tval in t])
+
+
     def propagate_profile(self, profile, t, return_log=False):
         """
         Compute the probability of the sequence state of the parent
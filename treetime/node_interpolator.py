@@ -6,10 +6,11 @@ from .distribution import Distribution
 def _create_initial_grid(node_dist, branch_dist):
     pass
 
-def _convolution_integrand(t_val, f, g,
-                           inverse_time=None, return_log=False):
+def _integrand_on_grid(t_val, f, g, inverse_time=None):
     '''
-    Evaluates int_tau f(t+tau)*g(tau) or int_tau f(t-tau)g(tau) if inverse time is TRUE
+    Evaluates the negative log of f(t+tau)*g(tau) or f(t-tau)*g(tau) if inverse
+    time is TRUE on a grid of tau that covers the region where f and g overlap.
+    This is the common kernel of the integral and the max convolution.
 
     Parameters
     -----------
@@ -27,15 +28,12 @@ def _convolution_integrand(t_val, f, g,
         time direction. If True, then the f(t-tau)*g(tau) is calculated, otherwise,
         f(t+tau)*g(tau)
 
-     return_log : bool
-        If True, the logarithm will be returned
-
-
     Returns
     -------
 
-     FG : Distribution
-        The function to be integrated as Distribution object (interpolator)
+     tau, fg : numpy arrays
+        The grid and the negative log of the integrand on this grid. Both are
+        None if the functions do not overlap.
 
     '''
 
@@ -55,29 +53,68 @@ def _convolution_integrand(t_val, f, g,
         tau_max = min(f.xmax-t_val, g.xmax)
         #print(tau_min, tau_max)
 
-
     if tau_max <= tau_min:
+        return None, None #  functions do not overlap
+
+    # create the tau-grid for the interpolation object in the overlap region
+    if inverse_time:
+        tau = np.unique(np.concatenate((g.x, t_val-f.x,[tau_min,tau_max])))
+    else:
+        tau = np.unique(np.concatenate((g.x, f.x-t_val,[tau_min,tau_max])))
+    tau = tau[(tau>tau_min-ttconf.TINY_NUMBER)&(tau<tau_max+ttconf.TINY_NUMBER)]
+    if len(tau)<10:
+        tau = np.linspace(tau_min, tau_max, 10)
+
+    if inverse_time: # add negative logarithms
+        tnode = t_val - tau
+        fg = f(tnode) + g(tau, tnode=tnode)
+    else:
+        fg = f(t_val + tau) + g(tau, tnode=t_val)
+
+    return tau, fg
+
+
+def _convolution_integrand(t_val, f, g,
+                           inverse_time=None, return_log=False):
+    '''
+    Evaluates int_tau f(t+tau)*g(tau) or int_tau f(t-tau)g(tau) if inverse time is TRUE
+
+    Parameters
+    -----------
+
+     t_val : double
+        Time point
+
+     f : Interpolation object
+        First multiplier in convolution
+
+     g : Interpolation object
+        Second multiplier in convolution
+
+     inverse_time : bool, None
+        time direction. If True, then the f(t-tau)*g(tau) is calculated, otherwise,
+        f(t+tau)*g(tau)
+
+     return_log : bool
+        If True, the logarithm will be returned
+
+
+    Returns
+    -------
+
+     FG : Distribution
+        The function to be integrated as Distribution object (interpolator)
+
+    '''
+    tau, fg = _integrand_on_grid(t_val, f, g, inverse_time=inverse_time)
+
+    if tau is None:
         if return_log:
             return ttconf.BIG_NUMBER
         else:
             return 0.0 #  functions do not overlap
 
     else:
-        # create the tau-grid for the interpolation object in the overlap region
-        if inverse_time:
-            tau = np.unique(np.concatenate((g.x, t_val-f.x,[tau_min,tau_max])))
-        else:
-            tau = np.unique(np.concatenate((g.x, f.x-t_val,[tau_min,tau_max])))
-        tau = tau[(tau>tau_min-ttconf.TINY_NUMBER)&(tau<tau_max+ttconf.TINY_NUMBER)]
-        if len(tau)<10:
-            tau = np.linspace(tau_min, tau_max, 10)
-
-        if inverse_time: # add negative logarithms
-            tnode = t_val - tau
-            fg = f(tnode) + g(tau, tnode=tnode)
-        else:
-            fg = f(t_val + tau) + g(tau, tnode=t_val)
-
         # create the interpolation object on this grid
         FG = Distribution(tau, fg, is_log=True, min_width = np.max([f.min_width, g.min_width]),
                           kind='linear', assume_sorted=True)
@@ -113,20 +150,21 @@ def _max_of_integrand(t_val, f, g, inverse_time=None, return_log=False):
     Returns
     -------
 
-     FG : Distribution
-        The function to be integrated as Distribution object (interpolator)
+     res : list
+        The value of the maximum (as negative log if return_log) and the
+        position tau of the maximum.
 
     '''
-    # return log is always True
-    FG = _convolution_integrand(t_val, f, g, inverse_time, return_log=True)
+    # the maximum is read off the integrand directly, no interpolation object needed
+    tau, fg = _integrand_on_grid(t_val, f, g, inverse_time=inverse_time)
 
-    if FG == ttconf.BIG_NUMBER:
+    if tau is None:
         res = [ttconf.BIG_NUMBER, 0]
 
     else:
-        X = FG.x[FG.y.argmin()]
-        Y = FG.y.min()
-        res =  [Y, X]
+        fg[np.isnan(fg)] = ttconf.BIG_NUMBER
+        idx = fg.argmin()
+        res = [fg[idx], tau[idx]]
 
     if not return_log:
         res[0] = np.exp(res[0])
@@ -184,7 +184,7 @@ def seq2array(seq, word_length=1, convert_upper=False, fill_overhangs=False, amb
         if len(seq_str)%word_length:
             raise ValueError("sequence length has to be multiple of word length")
         seq_array = np.array([seq_str[i*word_length:(i+1)*word_length]
-                              for i in range(len(seq_str)/word_length)])
+                              for i in range(len(seq_str)//word_length)])
 
     # substitute overhanging unsequenced tails
     if fill_overhangs:
@@ -285,7 +285,7 @@ def normalize_profile(in_profile, log=False, return_offset = True):
     """
     if log:
         tmp_prefactor = in_profile.max(axis=1)
-        tmp_prof = np.exp(in_profile.T - tmp_prefactor).T
+        tmp_prof = np.exp(in_profile - tmp_prefactor[:,None])
     else:
         tmp_prefactor = 0.0
         tmp_prof = in_profile
@@ -403,20 +403,31 @@ class TreeAnc(object):
         self.tree.root.mutation_length = self.tree.root.branch_length
         self.tree.ladderize()
         self._prepare_nodes()
-        self._leaves_lookup = {node.name:node for node in self.tree.get_terminals()}
 
 
     def _prepare_nodes(self):
         """
-        Set auxilliary parameters to every node of the tree.
+        Set auxilliary parameters to every node of the tree. Links to parents,
+        internal node names, the distance to the root, and the lookup of leaves
+        by name are all assigned in a single preorder traversal. The pre- and
+        postorder node lists are cached for repeated traversals and need to be
+        refreshed by calling this function after every topology change.
         """
         self.tree.root.up = None
         self.tree.root.tt = self
+        self.tree.root.dist2root = 0.0
         self.tree.root.bad_branch=self.tree.root.bad_branch if hasattr(self.tree.root, 'bad_branch') else False
 
         name_set = {n.name for n in self.tree.find_clades() if n.name}
         internal_node_count = 0
-        for clade in self.tree.get_nonterminals(order='preorder'): # parents first
+        self._leaves_lookup = {}
+        self._preorder = []
+        for clade in self.tree.find_clades(order='preorder'): # parents first
+            self._preorder.append(clade)
+            if clade.is_terminal():
+                self._leaves_lookup[clade.name] = clade
+                continue
+
             if clade.name is None:
                 tmp = "NODE_" + format(internal_node_count, '07d')
                 while tmp in name_set:
@@ -428,14 +439,16 @@ class TreeAnc(object):
             for c in clade.clades:
                 c.up = clade
                 c.tt = self
+                c.dist2root = clade.dist2root + c.mutation_length
 
+        self._postorder = []
         for clade in self.tree.find_clades(order='postorder'): # children first
+            self._postorder.append(clade)
             if clade.is_terminal():
                 clade.bad_branch = clade.bad_branch if hasattr(clade, 'bad_branch') else False
             else:
                 clade.bad_branch = all([c.bad_branch for c in clade])
 
-        self._calc_dist2root()
         self._internal_node_count = max(internal_node_count, self._internal_node_count)
 
 
@@ -806,7 +819,9 @@ class TreeAnc(object):
 
         self.logger("Postorder: computing likelihoods... ", 3)
         # propagate leaves --> root, set the marginal-likelihood messages
-        for node in self.tree.get_nonterminals(order='postorder'): #leaves -> root
+        for node in self._postorder: #leaves -> root
+            if node.is_terminal():
+                continue
             # regardless of what was before, set the profile to ones
             tmp_log_subtree_LH = np.zeros((L,n_states), dtype=float)
             node.marginal_subtree_LH_prefactor = np.zeros(L, dtype=float)
@@ -825,32 +840,37 @@ class TreeAnc(object):
         # propagate root -->> leaves, reconstruct the internal node sequences
         # provided the upstream message + the message from the complementary subtree
         N_diff = 0
-        for node in self.tree.find_clades(order='preorder'):
-            if node.up is None: # skip if node is root
+        # parents are visited before their children, hence the profile of each
+        # parent is final when its children are processed. The log of the parent
+        # profile is shared by all children and computed only once.
+        for parent in self._preorder:
+            if parent.is_terminal():
                 continue
-            if hasattr(node, 'branch_state'): del node.branch_state
-
-            # integrate the information coming from parents with the information
-            # of all children my multiplying it to the prev computed profile
-            node.marginal_outgroup_LH, pre = normalize_profile(np.log(np.maximum(ttconf.TINY_NUMBER, node.up.marginal_profile)) - node.marginal_log_Lx,
-                                                               log=True, return_offset=False)
-            if node.is_terminal() and (not reconstruct_tip_states): # skip remainder unless leaves are to be reconstructed
-                continue
-
-            tmp_msg_from_parent = self.gtr.evolve(node.marginal_outgroup_LH,
-                                                 self._branch_length_to_gtr(node), return_log=False)
-            node.marginal_profile, pre = normalize_profile(node.marginal_subtree_LH * tmp_msg_from_parent, return_offset=False)
-            # choose sequence based maximal marginal LH.
-            if assign_sequence:
-                seq, prof_vals, idxs = prof2seq(node.marginal_profile, self.gtr,
-                                                sample_from_prof=sample_from_profile, normalize=False)
+            log_parent_profile = np.log(np.maximum(ttconf.TINY_NUMBER, parent.marginal_profile))
+            for node in parent.clades:
+                if hasattr(node, 'branch_state'): del node.branch_state
+
+                # integrate the information coming from parents with the information
+                # of all children my multiplying it to the prev computed profile
+                node.marginal_outgroup_LH, pre = normalize_profile(log_parent_profile - node.marginal_log_Lx,
+                                                                   log=True, return_offset=False)
+                if node.is_terminal() and (not reconstruct_tip_states): # skip remainder unless leaves are to be reconstructed
+                    continue
 
-                if self.sequence_reconstruction:
-                    N_diff += (seq!=node.cseq).sum()
-                else:
-                    N_diff += self.data.compressed_length
-                #assign new sequence
-                node._cseq = seq
+                tmp_msg_from_parent = self.gtr.evolve(node.marginal_outgroup_LH,
+                                                     self._branch_length_to_gtr(node), return_log=False)
+                node.marginal_profile, pre = normalize_profile(node.marginal_subtree_LH * tmp_msg_from_parent, return_offset=False)
+                # choose sequence based maximal marginal LH.
+                if assign_sequence:
+                    seq, prof_vals, idxs = prof2seq(node.marginal_profile, self.gtr,
+                                                    sample_from_prof=sample_from_profile, normalize=False)
+
+                    if self.sequence_reconstruction:
+                        N_diff += (seq!=node.cseq).sum()
+                    else:
+                        N_diff += self.data.compressed_length
+                    #assign new sequence
+                    node._cseq = seq
 
         return N_diff
 
@@ -882,8 +902,10 @@ class TreeAnc(object):
         self.logger("TreeAnc._ml_anc_joint: type of reconstruction: Joint", 2)
 
         self.logger("TreeAnc._ml_anc_joint: Walking up the tree, computing likelihoods... ", 3)
+        # number of sites for which messages for all pairs of states are computed at once
+        chunk_size = max(1, ttconf.MAX_JOINT_MESSAGE_SIZE//n_states**2)
         # for the internal nodes, scan over all states j of this node, maximize the likelihood
-        for node in self.tree.find_clades(order='postorder'):
+        for node in self._postorder:
             if hasattr(node, 'branch_state'): del node.branch_state
             if node.up is None:
                 node.joint_Cx=None # not needed for root
@@ -908,24 +930,28 @@ class TreeAnc(object):
 
             # for every possible state of the parent node,
             # get the best state of the current node
-            # and compute the likelihood of this state
-            # preallocate storage
+            # and compute the likelihood of this state.
+            # Pij(i) * L_ch(i) for all parent states j at once: shape (sites, j, i)
+            # (log_transitions.T is (j,i), or (L,j,i) for site specific models).
+            # Sites are processed in chunks to bound the size of this array.
+            log_transitions_T = log_transitions.T
             node.joint_Lx = np.zeros((L, n_states))             # likelihood array
             node.joint_Cx = np.zeros((L, n_states), dtype=int)  # max LH indices
-            for char_i, char in enumerate(self.gtr.alphabet):
-                # Pij(i) * L_ch(i) for given parent state j
-                msg_to_parent = (log_transitions[:,char_i].T + msg_from_children)
-                # For this parent state, choose the best state of the current node:
-                node.joint_Cx[:, char_i] = msg_to_parent.argmax(axis=1)
+            for start in range(0, L, chunk_size):
+                sites = slice(start, start+chunk_size)
+                msg_to_parent = msg_from_children[sites,None,:] + (log_transitions_T if log_transitions_T.ndim==2
+                                                                   else log_transitions_T[sites])
+                # For each parent state, choose the best state of the current node:
+                node.joint_Cx[sites] = msg_to_parent.argmax(axis=2)
                 # compute the likelihood of the best state of the current node
-                # given the state of the parent (char_i)
-                node.joint_Lx[:, char_i] = msg_to_parent.max(axis=1)
+                # given the state of the parent
+                node.joint_Lx[sites] = msg_to_parent.max(axis=2)
 
         # root node profile = likelihood of the total tree
         msg_from_children = np.sum(np.stack([c.joint_Lx for c in self.tree.root], axis = 0), axis=0)
         # Pi(i) * Prod_ch Lch(i)
         self.tree.root.joint_Lx = msg_from_children + np.log(self.gtr.Pi).T
-        normalized_profile = (self.tree.root.joint_Lx.T - self.tree.root.joint_Lx.max(axis=1)).T
+        normalized_profile = self.tree.root.joint_Lx - self.tree.root.joint_Lx.max(axis=1)[:,None]
 
         # choose sequence characters from this profile.
         # treat root node differently to avoid piling up mutations on the longer branch
@@ -972,7 +998,7 @@ class TreeAnc(object):
 
         # do clean-up
         if not debug:
-            for node in self.tree.find_clades(order='preorder'):
+            for node in self._preorder:
                 del node.joint_Lx
                 del node.joint_Cx
                 if hasattr(node, 'seq_idx'):
@@ -1013,8 +1039,8 @@ class TreeAnc(object):
             mut_matrix_stack = np.einsum('ai,aj,ij->aij', pc, pp, expQt)
 
         # normalize this distribution
-        normalizer = mut_matrix_stack.sum(axis=2).sum(axis=1)
-        mut_matrix_stack = np.einsum('aij,a->aij', mut_matrix_stack, 1.0/normalizer)
+        normalizer = mut_matrix_stack.sum(axis=(1,2))
+        mut_matrix_stack /= normalizer[:,None,None]
 
         # expand to full sequence if requested
         if full_sequence:
@@ -1087,6 +1113,10 @@ class TreeAnc(object):
         Therefore, before calling this method, sequence reconstruction with
         either of the available models must be performed.
 
+        If :py:attr:`_batch_branch_length_ok` is True, all branches are
+        optimized at once by :py:meth:`GTR.optimal_t_compressed_batch`.
+        Otherwise, :py:meth:`optimal_branch_length` is called for each branch.
+
         Parameters
         ----------
          **kwargs :
@@ -1108,13 +1138,24 @@ class TreeAnc(object):
 
         store_old_dist = kwargs['store_old'] if 'store_old' in kwargs else False
 
+        nodes = [node for node in self._postorder if node.up is not None]
+        for node in nodes:
+            if not hasattr(node, 'branch_state'):
+                self.add_branch_state(node)
+
+        if self._batch_branch_length_ok:
+            # optimize all branches at once
+            new_lens = self.gtr.optimal_t_compressed_batch([node.branch_state['pair'] for node in nodes],
+                                                           [node.branch_state['multiplicity'] for node in nodes])
+        else:
+            new_lens = [self.optimal_branch_length(node) for node in nodes]
+
         max_bl = 0
-        for node in self.tree.find_clades(order='postorder'):
-            if node.up is None: continue # this is the root
+        for node, new_len in zip(nodes, new_lens):
             if store_old_dist:
                 node._old_length = node.branch_length
 
-            new_len = max(0,self.optimal_branch_length(node))
+            new_len = max(0,new_len)
 
             self.logger("Optimization results: old_len=%.4e, new_len=%.4e"
                         " Updating branch length..."%(node.branch_length, new_len), 5)
@@ -1129,13 +1170,22 @@ class TreeAnc(object):
                         " \n\t ****PLEASE OPTIMIZE BRANCHES USING: "
                         " \n\t ****branch_length_mode='input' or 'marginal'", 0, warn=True)
 
-        # as branch lengths changed, the distance to root etc need to be recalculated
-        self.tree.root.up = None
-        self.tree.root.dist2root = 0.0
-        self._prepare_nodes()
+        # as branch lengths changed, the distance to root needs to be recalculated
+        self._calc_dist2root()
         return ttconf.SUCCESS
 
 
+    @property
+    def _batch_branch_length_ok(self):
+        """
+        Whether joint branch length optimization can optimize all branches at
+        once rather than calling :py:meth:`optimal_branch_length` per branch.
+        This requires a site-independent model. Subclasses that customize
+        :py:meth:`optimal_branch_length` should return False.
+        """
+        return len(self.gtr.eigenvals.shape)==1
+
+
     def optimal_branch_length(self, node):
         '''
         Calculate optimal branch length given the sequences of node and parent
@@ -1344,6 +1394,9 @@ class TreeAnc(object):
                 for clade in node.clades:
                     clade.up = node.up
 
+        # topology changed, refresh cached traversals
+        self._prepare_nodes()
+
 
 #####################################################################
 ## GTR INFERENCE
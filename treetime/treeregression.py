@@ -187,43 +187,41 @@ class TreeRegression(object):
         calculate the weighted sums of the tip and branch values and
         their second moments.
         """
+        # contributions of each child to the averages of its parent, towards the root
+        child_Q = {}
         for n in self.tree.get_nonterminals(order='postorder'):
             Q = np.zeros(6, dtype=float)
+            child_Q[n] = []
             for c in n:
                 tv = self.tip_value(c)
                 bv = self.branch_value(c)
                 var = self.branch_variance(c)
-                Q += self.propagate_averages(c, tv, bv, var)
+                cQ = self.propagate_averages(c, tv, bv, var)
+                child_Q[n].append(cQ)
+                Q += cQ
             n.Q=Q
 
-        for n in self.tree.find_clades(order='preorder'):
-            O = np.zeros(6, dtype=float)
+        self.tree.root.Qtot = self.tree.root.Q
+        for n in self.tree.get_nonterminals(order='preorder'):
+            # contribution of everything outside the clade of n, shared by all children
             if n==self.tree.root:
-                n.Qtot = n.Q
-                continue
-
-            for c in n.up:
-                if c==n:
-                    continue
-
-                tv = self.tip_value(c)
-                bv = self.branch_value(c)
-                var = self.branch_variance(c)
-                O += self.propagate_averages(c, tv, bv, var)
-
-            if n.up!=self.tree.root:
-                c = n.up
-                tv = self.tip_value(c)
-                bv = self.branch_value(c)
-                var = self.branch_variance(c)
-                O += self.propagate_averages(c, tv, bv, var, outgroup=True)
-            n.O = O
-
-            if not n.is_terminal():
+                outgroup_Q = None
+            else:
                 tv = self.tip_value(n)
                 bv = self.branch_value(n)
                 var = self.branch_variance(n)
-                n.Qtot = n.Q + self.propagate_averages(n, tv, bv, var, outgroup=True)
+                outgroup_Q = self.propagate_averages(n, tv, bv, var, outgroup=True)
+                n.Qtot = n.Q + outgroup_Q
+
+            contribs = child_Q[n]
+            for ci, c in enumerate(n.clades):
+                O = np.zeros(6, dtype=float)
+                for si in range(len(contribs)):
+                    if si!=ci:
+                        O += contribs[si]
+                if outgroup_Q is not None:
+                    O += outgroup_Q
+                c.O = O
 
 
     def propagate_averages(self, n, tv, bv, var, outgroup=False):
@@ -290,9 +288,13 @@ class TreeRegression(object):
         for n in self.tree.get_nonterminals(order='preorder'):
             for c in n:
                 c._v = n._v + self.branch_value(c)
-        raw = np.array([(self.tip_value(n), n._v) for n in self.tree.get_terminals()
-                         if self.tip_value(n) is not None])
-        return np.corrcoef(raw.T)[0,1]
+        # missing tip values are marked as NaN and masked out
+        tips = self.tree.get_terminals()
+        tip_vals = np.fromiter((np.nan if tv is None else tv
+                                for tv in map(self.tip_value, tips)), dtype=float, count=len(tips))
+        rtt = np.fromiter((n._v for n in tips), dtype=float, count=len(tips))
+        valid = ~np.isnan(tip_vals)
+        return np.corrcoef(tip_vals[valid], rtt[valid])[0,1]
 
 
     def regression(self, slope=None):
@@ -330,6 +332,9 @@ class TreeRegression(object):
         """
         self._calculate_averages()
         best_root = {"chisq": np.inf}
+        # chisq of rooting at an internal node is needed for the node and
+        # each of its children, memoize it across branches
+        chisq_at_node = {}
         for n in self.tree.find_clades():
             if n==self.tree.root:
                 continue
@@ -337,7 +342,8 @@ class TreeRegression(object):
             tv = self.tip_value(n)
             bv = self.branch_value(n)
             var = self.branch_variance(n)
-            x, chisq = self._optimal_root_along_branch(n, tv, bv, var, slope=slope)
+            x, chisq = self._optimal_root_along_branch(n, tv, bv, var, slope=slope,
+                                                       chisq_at_node=chisq_at_node)
             if chisq<best_root["chisq"]:
                 tmpQ = self.propagate_averages(n, tv, bv*x, var*x) \
                      + self.propagate_averages(n, tv, bv*(1-x), var*(1-x), outgroup=True)
@@ -378,19 +384,26 @@ class TreeRegression(object):
         return best_root
 
 
-    def _optimal_root_along_branch(self, n, tv, bv, var, slope=None):
+    def _optimal_root_along_branch(self, n, tv, bv, var, slope=None, chisq_at_node=None):
         from scipy.optimize import minimize_scalar
         def chisq(x):
             tmpQ = self.propagate_averages(n, tv, bv*x, var*x) \
                  + self.propagate_averages(n, tv, bv*(1-x), var*(1-x), outgroup=True)
             return base_regression(tmpQ, slope=slope)['chisq']
 
+        def chisq_node(m):
+            if chisq_at_node is None:
+                return base_regression(m.Qtot, slope=slope)['chisq']
+            if m not in chisq_at_node:
+                chisq_at_node[m] = base_regression(m.Qtot, slope=slope)['chisq']
+            return chisq_at_node[m]
+
         if n.bad_branch or (n!=self.tree.root and n.up.bad_branch):
             return np.nan, np.inf
 
 
-        chisq_prox = np.inf if n.is_terminal() else base_regression(n.Qtot, slope=slope)['chisq']
-        chisq_dist = np.inf if n==self.tree.root else base_regression(n.up.Qtot, slope=slope)['chisq']
+        chisq_prox = np.inf if n.is_terminal() else chisq_node(n)
+        chisq_dist = np.inf if n==self.tree.root else chisq_node(n.up)
 
         grid = np.linspace(0.001,0.999,6)
         chisq_grid = np.array([chisq(x) for x in grid])
@@ -500,30 +513,42 @@ class TreeRegression(object):
         tips = self.tree.get_terminals()
         internal = self.tree.get_nonterminals()
 
-        # get values of terminals
-        xi = np.array([self.tip_value(n) for n in tips])
-        yi = np.array([n._v for n in tips])
-        ind = np.array([n.bad_branch  if hasattr(n, 'bad_branch') else False for n in tips])
+        # get values of terminals, filling one array per quantity in a single pass
+        xi = np.empty(len(tips), dtype=float)
+        yi = np.empty(len(tips), dtype=float)
+        ind = np.zeros(len(tips), dtype=bool)
+        for i, n in enumerate(tips):
+            tv = self.tip_value(n)
+            xi[i] = np.nan if tv is None else tv
+            yi[i] = n._v
+            ind[i] = getattr(n, 'bad_branch', False)
         if add_internal:
-            xi_int = np.array([n.numdate for n in internal])
-            yi_int = np.array([n._v for n in internal])
-            ind_int = np.array([n.bad_branch  if hasattr(n, 'bad_branch') else False  for n in internal])
+            xi_int = np.empty(len(internal), dtype=float)
+            yi_int = np.empty(len(internal), dtype=float)
+            ind_int = np.zeros(len(internal), dtype=bool)
+            for i, n in enumerate(internal):
+                xi_int[i] = n.numdate
+                yi_int[i] = n._v
+                ind_int[i] = getattr(n, 'bad_branch', False)
 
         if regression:
             # plot regression line
             t_mrca = -regression['intercept']/regression['slope']
+            # range of the data along the time axis, each reduction done once
+            xmax = np.max(xi[~ind])
             if add_internal:
-                time_span = np.max(xi_int[~ind_int]) - np.min(xi_int[~ind_int])
-                x_vals = np.array([max(np.min(xi_int[~ind_int]), t_mrca) - 0.1*time_span, np.max(xi[~ind])+0.05*time_span])
+                xi_min, xi_max = np.min(xi_int[~ind_int]), np.max(xi_int[~ind_int])
             else:
-                time_span = np.max(xi[~ind]) - np.min(xi[~ind])
-                x_vals = np.array([max(np.min(xi[~ind]), t_mrca) - 0.1*time_span, np.max(xi[~ind]+0.05*time_span)])
+                xi_min, xi_max = np.min(xi[~ind]), xmax
+            time_span = xi_max - xi_min
+            x_vals = np.array([max(xi_min, t_mrca) - 0.1*time_span, xmax+0.05*time_span])
 
             # plot confidence interval
             if confidence and 'cov' in regression:
                 x_vals = np.linspace(x_vals[0], x_vals[1], 100)
                 y_vals = regression['slope']*x_vals + regression['intercept']
-                dev = n_sigma*np.array([np.sqrt(regression['cov'][:2,:2].dot(np.array([x, 1])).dot(np.array([x,1]))) for x in x_vals])
+                X = np.array([x_vals, np.ones_like(x_vals)]).T
+                dev = n_sigma*np.sqrt(np.einsum('ti,ij,tj->t', X, regression['cov'][:2,:2], X))
                 dev_slope = n_sigma*np.sqrt(regression['cov'][0,0])
                 ax.fill_between(x_vals, y_vals-dev, y_vals+dev, alpha=0.2)
                 dp = np.array([regression['intercept']/regression['slope']**2,-1./regression['slope']])
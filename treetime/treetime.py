@@ -330,16 +330,18 @@ class TreeTime(ClockTree):
 
         clock_rate = self.clock_model['slope']
         icpt = self.clock_model['intercept']
-        res = {}
-        for node in terminals:
-            if hasattr(node, 'raw_date_constraint') and  (node.raw_date_constraint is not None):
-                res[node] = node.dist2root - clock_rate*np.mean(node.raw_date_constraint) - icpt
-
-        residuals = np.array(list(res.values()))
+        dated = [node for node in terminals
+                 if hasattr(node, 'raw_date_constraint') and (node.raw_date_constraint is not None)]
+        # residuals of all dated tips with respect to the clock model in one go
+        dist2root = np.fromiter((node.dist2root for node in dated), dtype=float, count=len(dated))
+        mean_dates = np.fromiter((np.mean(node.raw_date_constraint) for node in dated),
+                                 dtype=float, count=len(dated))
+        residuals = dist2root - clock_rate*mean_dates - icpt
         iqd = np.percentile(residuals,75) - np.percentile(residuals,25)
+        is_outlier = np.abs(residuals)>n_iqd*iqd
         bad_branch_count = 0
-        for node,r in res.items():
-            if abs(r)>n_iqd*iqd and node.up.up is not None:
+        for node, r, outlier in zip(dated, residuals, is_outlier):
+            if outlier and node.up.up is not None:
                 self.logger('TreeTime.ClockFilter: marking %s as outlier, residual %f interquartile distances'%(node.name,r/iqd), 3, warn=True)
                 node.bad_branch=True
                 bad_branch_count += 1
@@ -446,9 +448,11 @@ class TreeTime(ClockTree):
             elif root in self._leaves_lookup:
                 new_root = self._leaves_lookup[root]
             elif root=='oldest':
-                new_root = sorted([n for n in self.tree.get_terminals()
-                                   if n.raw_date_constraint is not None],
-                                   key=lambda x:np.mean(x.raw_date_constraint))[0]
+                dated = [n for n in self.tree.get_terminals()
+                         if n.raw_date_constraint is not None]
+                mean_dates = np.fromiter((np.mean(n.raw_date_constraint) for n in dated),
+                                         dtype=float, count=len(dated))
+                new_root = dated[mean_dates.argmin()]
             else:
                 raise UnknownMethodError('TreeTime.reroot -- ERROR: unsupported rooting mechanisms or root not found')
 
@@ -521,6 +525,9 @@ class TreeTime(ClockTree):
             if node.up is not None:
                 self.tree.collapse(node)
 
+        # topology changed, refresh cached traversals
+        self._prepare_nodes()
+
         if poly_found:
             self.logger('TreeTime.resolve_polytomies: introduces %d new nodes'%poly_found,3)
         else:
@@ -557,42 +564,99 @@ class TreeTime(ClockTree):
         def cost_gain(n1, n2, parent):
             """
             cost gained if the two nodes would have been connected.
+            Without merger costs, the branch length interpolators are piecewise
+            linear, hence the optimum is attained at one of their grid points
+            (shifted by the node positions). These are evaluated in one vectorized
+            call. With a merger cost, the gain is optimized by bounded minimization.
             """
             try:
-                cg = sciopt.minimize_scalar(_c_gain,
-                    bounds=[max(n1.time_before_present,n2.time_before_present), parent.time_before_present],
-                    method='Bounded',args=(n1,n2, parent))
-                return cg['x'], - cg['fun']
+                tmin = max(n1.time_before_present,n2.time_before_present)
+                tmax = parent.time_before_present
+                if (n1.branch_length_interpolator.merger_cost is not None or
+                    n2.branch_length_interpolator.merger_cost is not None):
+                    cg = sciopt.minimize_scalar(_c_gain, bounds=[tmin, tmax],
+                                                method='Bounded',args=(n1,n2, parent))
+                    return cg['x'], - cg['fun']
+
+                t_grid = np.concatenate(([tmin, tmax],
+                            n1.time_before_present + n1.branch_length_interpolator.x/n1.branch_length_interpolator.gamma,
+                            n2.time_before_present + n2.branch_length_interpolator.x/n2.branch_length_interpolator.gamma))
+                t_grid = np.unique(t_grid[(t_grid>=tmin)&(t_grid<=tmax)])
+                # t_grid is sorted, the last entry is the current parent position
+                # whose gain is zero by definition -- remove round-off offsets.
+                # like the bounded optimization, the parent position itself is excluded.
+                cg = _c_gain(t_grid, n1, n2, parent)
+                cg -= cg[-1]
+                opt_idx = np.argmin(cg[:-1]) if len(t_grid)>1 else 0
+                if opt_idx==0 and len(t_grid)>1:
+                    # the optimum is at the older child. Like the bounded optimization,
+                    # approach it from within the first segment rather than placing
+                    # the merger at zero branch length.
+                    cg = sciopt.minimize_scalar(_c_gain, bounds=[t_grid[0], t_grid[1]],
+                                                method='Bounded',args=(n1,n2, parent))
+                    return cg['x'], - cg['fun']
+                return t_grid[opt_idx], - cg[opt_idx]
             except:
                 self.logger("TreeTime._poly.cost_gain: optimization of gain failed", 3, warn=True)
                 return parent.time_before_present, 0.0
 
 
         def merge_nodes(source_arr, isall=False):
-            mergers = np.array([[cost_gain(n1,n2, clade) if i1<i2 else (0.0,-1.0)
-                                    for i1,n1 in enumerate(source_arr)]
-                                for i2, n2 in enumerate(source_arr)])
+            # the gain of a merger is the sum of the gains of both nodes when their
+            # parent is moved to time t, minus the cost of the new branch. Splitting
+            # the latter evenly between the nodes bounds the gain of a merger by the
+            # sum of per-node maxima. For piecewise linear branch length distributions,
+            # i.e. without merger costs, these are attained at grid points. Candidate
+            # pairs are evaluated best-first until no bound exceeds the best gain found.
+            # With merger costs, there is no bound and all pairs are evaluated.
+            prune = all(getattr(n, 'branch_length_interpolator', None) is not None
+                        and n.branch_length_interpolator.merger_cost is None for n in source_arr)
+            max_gain = {}
+            def add_bound(n):
+                if prune:
+                    bli = n.branch_length_interpolator
+                    bl = clade.time_before_present - n.time_before_present
+                    x = bli.x/bli.gamma
+                    x = np.concatenate(([0.0], x[(x>0)&(x<bl)]))
+                    gains = bli(bl) - bli(x) - 0.5*zero_branch_slope*(bl - x)
+                    max_gain[n] = max(0.0, gains.max())
+                else:
+                    max_gain[n] = np.inf
+
+            for n in source_arr:
+                add_bound(n)
+            mergers = {}
             LH = 0
             while len(source_arr) > 1 + int(isall):
                 # max possible gains of the cost when connecting the nodes:
                 # this is only a rough approximation because it assumes the new node positions
                 # to be optimal
-                new_positions = mergers[:,:,0]
-                cost_gains = mergers[:,:,1]
-                # set zero to large negative value and find optimal pair
-                np.fill_diagonal(cost_gains, -1e11)
-                idxs = np.unravel_index(cost_gains.argmax(),cost_gains.shape)
-                if (idxs[0] == idxs[1]) or cost_gains.max()<0:
+                pairs = ((n1,n2) for i1,n1 in enumerate(source_arr) for n2 in source_arr[i1+1:])
+                if prune:
+                    pairs = sorted(pairs, key=lambda pair: max_gain[pair[0]] + max_gain[pair[1]], reverse=True)
+                best_pair = None
+                for pair in pairs:
+                    bound = max_gain[pair[0]] + max_gain[pair[1]]
+                    if best_pair is not None and mergers[best_pair][1] >= bound:
+                        break
+                    if pair not in mergers:
+                        mergers[pair] = cost_gain(pair[0], pair[1], clade)
+                    if best_pair is None or mergers[pair][1] > mergers[best_pair][1]:
+                        best_pair = pair
+
+                if best_pair is None or mergers[best_pair][1]<0:
                     self.logger("TreeTime._poly.merge_nodes: node is not fully resolved "+clade.name,4)
                     return LH
 
-                n1, n2 = source_arr[idxs[0]], source_arr[idxs[1]]
-                LH += cost_gains[idxs]
+                new_position, gain = mergers[best_pair]
+
+                n1, n2 = best_pair
+                LH += gain
 
                 new_node = Phylo.BaseTree.Clade()
 
                 # fix positions and branch lengths
-                new_node.time_before_present = new_positions[idxs]
+                new_node.time_before_present = new_position
                 new_node.branch_length = clade.time_before_present - new_node.time_before_present
                 new_node.clades = [n1,n2]
                 n1.branch_length = new_node.time_before_present - n1.time_before_present
@@ -621,29 +685,13 @@ class TreeTime(ClockTree):
                 clade.clades.remove(n2)
                 clade.clades.append(new_node)
                 self.logger('TreeTime._poly.merge_nodes: creating new node as child of '+clade.name,3)
-                self.logger("TreeTime._poly.merge_nodes: Delta-LH = " + str(cost_gains[idxs].round(3)), 3)
+                self.logger("TreeTime._poly.merge_nodes: Delta-LH = " + str(np.round(gain, 3)), 3)
 
                 # and modify source_arr array for the next loop
-                if len(source_arr)>2: # if more than 3 nodes in polytomy, replace row/column
-                    for ii in np.sort(idxs)[::-1]:
-                        tmp_ind = np.arange(mergers.shape[0])!=ii
-                        mergers = mergers[tmp_ind].swapaxes(0,1)
-                        mergers = mergers[tmp_ind].swapaxes(0,1)
-
-                    source_arr.remove(n1)
-                    source_arr.remove(n2)
-                    new_gains = np.array([[cost_gain(n1,new_node, clade) for n1 in source_arr]])
-                    mergers = np.vstack((mergers, new_gains)).swapaxes(0,1)
-
-                    source_arr.append(new_node)
-                    new_gains = np.array([[cost_gain(n1,new_node, clade) for n1 in source_arr]])
-                    mergers = np.vstack((mergers, new_gains)).swapaxes(0,1)
-                else: # otherwise just recalculate matrix
-                    source_arr.remove(n1)
-                    source_arr.remove(n2)
-                    source_arr.append(new_node)
-                    mergers = np.array([[cost_gain(n1,n2, clade) for n1 in source_arr]
-                                       for n2 in source_arr])
+                source_arr.remove(n1)
+                source_arr.remove(n2)
+                source_arr.append(new_node)
+                add_bound(new_node)
 
             return LH
 
@@ -743,7 +791,7 @@ class TreeTime(ClockTree):
         self.logger("TreeTime.relaxed_clock: slack=%f, coupling=%f"%(slack, coupling),2)
 
         c=1.0/self.one_mutation
-        for node in self.tree.find_clades(order='postorder'):
+        for node in self._postorder:
             opt_len = node.mutation_length
             act_len = node.clock_length if hasattr(node, 'clock_length') else node.branch_length
 
@@ -764,7 +812,7 @@ class TreeTime(ClockTree):
                             - coupling*child._k1*child._k2/denom**2 \
                             + coupling*child._k1/denom)
 
-        for node in self.tree.find_clades(order='preorder'):
+        for node in self._preorder:
             if node.up is None:
                 node.gamma = max(0.1, -0.5*node._k1/node._k2)
             else:
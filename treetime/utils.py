@@ -1,13 +1,12 @@
 from __future__ import division, print_function, absolute_import
 import os,sys
 import datetime
+from calendar import isleap
 import pandas as pd
 import numpy as np
 from scipy.interpolate import interp1d
-from scipy.integrate import quad
-from scipy import stats
-from scipy.ndimage import binary_dilation
 from . import TreeTimeError
+from .distribution import LinearInterp
 
 class DateConversion(object):
     """
@@ -119,6 +118,9 @@ def min_interp(interp_object):
     Find the global minimum of a function represented as an interpolation object.
     """
     try:
+        # plain interpolators store their values at the knots, no need to evaluate
+        if isinstance(interp_object, (interp1d, LinearInterp)):
+            return interp_object.x[interp_object.y.argmin()]
         return interp_object.x[interp_object(interp_object.x).argmin()]
     except Exception as e:
         s = "Cannot find minimum of the interpolation object" + str(interp_object.x) + \
@@ -150,8 +152,6 @@ def numeric_date(dt=None):
         date of to be converted. if None, assume today
 
     """
-    from calendar import isleap
-
     if dt is None:
         dt = datetime.datetime.now()
 
@@ -179,7 +179,6 @@ def datetime_from_numeric(numdate):
     datetime.datetime
         datetime object
     """
-    from calendar import isleap
     days_in_year = 366 if isleap(int(numdate)) else 365
     # add a small number of the time elapsed in a year to avoid
     # unexpected behavior for values 1/365, 2/365, etc
@@ -252,8 +251,7 @@ def parse_dates(date_file, name_col=None, date_col=None):
             d = df.iloc[0,ci]
             # strip quotation marks
             if type(d)==str and d[0] in ['"', "'"] and d[-1] in ['"', "'"]:
-                for i,tmp_d in enumerate(df.iloc[:,ci]):
-                    df.iloc[i,ci] = tmp_d.strip(d[0])
+                df.iloc[:,ci] = df.iloc[:,ci].str.strip(d[0])
             if 'date' in col.lower():
                 potential_date_columns.append((ci, col))
             if any([x==col.lower() for x in ['name', 'strain', 'accession']]):
@@ -288,33 +286,21 @@ def parse_dates(date_file, name_col=None, date_col=None):
                 date_col = potential_date_columns[0][1]
 
             print("\tUsing column '%s' as date."%date_col)
-            for ri, row in df.iterrows():
-                date_str = row.loc[date_col]
-                k = row.loc[index_col]
-                # try parsing as a float first
-                try:
-                    if date_str:
-                        dates[k] = float(date_str)
-                    else:
-                        dates[k] = None
-                    continue
-                except ValueError:
-                    # try whether the date string can be parsed as [2002.2:2004.3]
-                    # to indicate general ambiguous ranges
-                    if date_str[0]=='[' and date_str[-1]==']' and len(date_str[1:-1].split(':'))==2:
-                        try:
-                            dates[k] = [float(x) for x in date_str[1:-1].split(':')]
-                            continue
-                        except ValueError:
-                            pass
-                    # try date format parsing 2017-08-12
-                    try:
-                        tmp_date = pd.to_datetime(date_str)
-                        dates[k] = numeric_date(tmp_date)
-                    except ValueError:  # try ambiguous date format parsing 2017-XX-XX
-                        lower, upper = ambiguous_date_to_date_range(date_str, '%Y-%m-%d')
-                        if lower is not None:
-                            dates[k] = [numeric_date(x) for x in [lower, upper]]
+            date_strs = df[date_col]
+            # the common cases, numeric dates and ISO dates like 2017-08-12,
+            # are converted in bulk. Everything else is parsed one by one.
+            numeric = pd.to_numeric(date_strs, errors='coerce')
+            parsed = {d:float(v) for d, v in zip(date_strs, numeric) if not np.isnan(v)}
+            remaining = pd.unique(date_strs[numeric.isna() & date_strs.notna()])
+            iso_dates = pd.to_datetime(remaining, format='%Y-%m-%d', errors='coerce')
+            parsed.update({d:numeric_date(v) for d, v in zip(remaining, iso_dates) if not pd.isnull(v)})
+            # many samples share a date, parse each distinct string only once
+            for k, date_str in zip(df[index_col], date_strs):
+                if date_str not in parsed:
+                    parsed[date_str] = _parse_date_string(date_str)
+                val = parsed[date_str]
+                if val is not _UNPARSED:
+                    dates[k] = list(val) if type(val)==list else val
 
         else:
             raise TreeTimeError("ERROR: Metadata file has no column which looks like a sampling date!")
@@ -328,6 +314,40 @@ def parse_dates(date_file, name_col=None, date_col=None):
         raise
 
 
+# marker for date strings that could not be parsed
+_UNPARSED = object()
+
+def _parse_date_string(date_str):
+    """
+    parse a single entry of the date column of a meta data file. Returns a
+    float, a list [lower, upper] of floats for ambiguous dates, None for
+    empty entries, or _UNPARSED if the string could not be interpreted.
+    """
+    # try parsing as a float first
+    try:
+        if date_str:
+            return float(date_str)
+        else:
+            return None
+    except ValueError:
+        # try whether the date string can be parsed as [2002.2:2004.3]
+        # to indicate general ambiguous ranges
+        if date_str[0]=='[' and date_str[-1]==']' and len(date_str[1:-1].split(':'))==2:
+            try:
+                return [float(x) for x in date_str[1:-1].split(':')]
+            except ValueError:
+                pass
+        # try date format parsing 2017-08-12
+        try:
+            tmp_date = pd.to_datetime(date_str)
+            return numeric_date(tmp_date)
+        except ValueError:  # try ambiguous date format parsing 2017-XX-XX
+            lower, upper = ambiguous_date_to_date_range(date_str, '%Y-%m-%d')
+            if lower is not None:
+                return [numeric_date(x) for x in [lower, upper]]
+    return _UNPARSED
+
+
 def ambiguous_date_to_date_range(mydate, fmt="%Y-%m-%d", min_max_year=None):
     """parse an abiguous date such as 2017-XX-XX to [2017,2017.999]
 